@@ -12,6 +12,7 @@ from .script import (
     RegexReplacementFilter,
     StartMarkerFilter,
     EndMarkerFilter,
+    SliceMarkerFilter,
     CommentFilter,
 )
 
@@ -25,5 +26,6 @@ __all__ = [
     'RegexReplacementFilter',
     'StartMarkerFilter',
     'EndMarkerFilter',
+    'SliceMarkerFilter',
     'CommentFilter',
 ]
@@ -3,18 +3,36 @@ Provide wrapper classes for the asciinema file format (version 2).
 """
 
 import dataclasses
+import heapq
 import json
 import re
 
+try:
+    import orjson
 
-@dataclasses.dataclass
+    _loads = orjson.loads
+
+    def _dump_line(record):
+        return orjson.dumps(record)
+
+except ModuleNotFoundError:
+    orjson = None
+
+    _loads = json.loads
+
+    def _dump_line(record):
+        line = json.dumps(record, separators=(',', ':'), ensure_ascii=False)
+        return line.encode('utf-8')
+
+
+@dataclasses.dataclass(slots=True)
 class Theme:
     fg: str
     bg: str
     palette: list[str]
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Header:
     version: int
     width: int
@@ -28,33 +46,51 @@ class Header:
     theme: Theme | None = None
 
     def as_data(self):
-        return {
-            name: value
-            for (name, value) in dataclasses.asdict(self).items()
-            if value is not None
-        }
+        # NOTE: avoid dataclasses.asdict, which recursively deep-copies
+        # every field value only for the copies to be discarded once the
+        # header has been serialised.
+        data = {}
+        for field in dataclasses.fields(self):
+            value = getattr(self, field.name)
+            if value is None:
+                continue
+            if isinstance(value, Theme):
+                value = {
+                    'fg': value.fg,
+                    'bg': value.bg,
+                    'palette': list(value.palette),
+                }
+            data[field.name] = value
+        return data
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Event:
     time: float
 
-    def __post_init__(self):
-        self.event_id = self.__class__.__name__
+    @property
+    def event_id(self):
+        # NOTE: determined by the event type, so no per-instance storage.
+        return type(self).__name__
 
     def as_data(self):
         raise NotImplementedError()
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class OutputEvent(Event):
-    data: str
+    """
+    Terminal output, stored as UTF-8 bytes; this halves the memory
+    footprint of (typically ASCII) output data relative to ``str``.
+    """
+
+    data: bytes
 
     def as_data(self):
-        return [self.time, 'o', self.data]
+        return [self.time, 'o', self.data.decode('utf-8')]
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class InputEvent(Event):
     data: str
 
@@ -62,7 +98,7 @@ class InputEvent(Event):
         return [self.time, 'i', self.data]
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class MarkerEvent(Event):
     label: str
 
@@ -70,7 +106,7 @@ class MarkerEvent(Event):
         return [self.time, 'm', self.label]
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class CommentEvent(Event):
     """
     An event that updates the text in the GNU screen status bar.
@@ -86,7 +122,7 @@ class CommentEvent(Event):
         raise ValueError('Comment events must be filtered')
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class ResizeEvent(Event):
     columns: int
     rows: int
@@ -95,7 +131,7 @@ class ResizeEvent(Event):
         return [self.time, 'r', f'{self.columns}x{self.rows}']
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class AsciiCast:
     """
     An asciinema screencast.
@@ -110,39 +146,22 @@ class AsciiCast:
             event_list = event_filter.apply(self.header, event_list)
         return dataclasses.replace(self, events=event_list)
 
-    def insert_events(self, events):
+    def insert_events(self, events, assume_sorted=False):
         if len(events) == 0:
             return self
         if len(self.events) == 0:
             return dataclasses.replace(self, events=events)
 
-        event_times = [event.time for event in events]
-        if event_times != sorted(event_times):
-            raise ValueError('Events must be sorted chronologically')
-
-        new_events = []
-        next_event, remaining_events = events[0], events[1:]
-        for current_event in self.events:
-            if next_event is None or current_event.time <= next_event.time:
-                new_events.append(current_event)
-                continue
-
-            while next_event.time < current_event.time:
-                new_events.append(next_event)
-                if remaining_events:
-                    next_event = remaining_events[0]
-                    remaining_events = remaining_events[1:]
-                else:
-                    next_event = None
-                    break
-
-            new_events.append(current_event)
-
-        if next_event is not None:
-            new_events.append(next_event)
-        for event in remaining_events:
-            new_events.append(event)
+        if not assume_sorted:
+            event_times = [event.time for event in events]
+            if event_times != sorted(event_times):
+                raise ValueError('Events must be sorted chronologically')
 
+        # NOTE: both lists are sorted, so merge them in a single pass.
+        # Existing events come first when times are equal.
+        new_events = list(
+            heapq.merge(self.events, events, key=lambda event: event.time)
+        )
         return dataclasses.replace(self, events=new_events)
 
     @staticmethod
@@ -150,71 +169,101 @@ class AsciiCast:
         """
         Load an asciinema screencast from ``cast_file``.
         """
-        with open(cast_file) as f:
-            data = [json.loads(line) for line in f]
-        return parse_cast(data)
+        # NOTE: read the file as raw bytes in a single call, and decode each
+        # line with the fastest available JSON parser.
+        with open(cast_file, 'rb') as f:
+            lines = f.read().splitlines()
+        if not lines:
+            raise ValueError('Missing asciicast header')
+        header = parse_header(_loads(lines[0]))
+        events = [
+            parse_event(_loads(line), ix)
+            for ix, line in enumerate(lines[1:], start=1)
+        ]
+        return AsciiCast(header=header, events=events)
+
+    def _iter_records(self):
+        yield self.header.as_data()
+        for event in self.events:
+            yield event.as_data()
 
     def to_lines(self):
-        header_record = self.header.as_data()
-        event_records = [event.as_data() for event in self.events]
-        records = [header_record] + event_records
-        return [json.dumps(record) for record in records]
+        return [
+            _dump_line(record).decode('utf-8')
+            for record in self._iter_records()
+        ]
 
     def save(self, cast_file):
         """
         Save this asciinema screencast to ``cast_file``.
         """
-        # NOTE: when saving, each item (header / event) must be a single line.
-        lines = self.to_lines()
-        with open(cast_file, 'w') as f:
-            for line in lines:
-                f.write(f'{line}\n')
+        # NOTE: when saving, each item (header / event) must be a single
+        # line; write each line as it is serialised, rather than collecting
+        # every line in memory first.
+        with open(cast_file, 'wb') as f:
+            for record in self._iter_records():
+                f.write(_dump_line(record))
+                f.write(b'\n')
 
 
-def parse_cast(data):
-    if isinstance(data[0], dict):
-        try:
-            header = Header(**data[0])
-        except TypeError as e:
-            raise ValueError('Invalid header data') from e
-        if header.version != 2:
-            raise ValueError(
-                f'Unsupported file format version {header.version}'
-            )
-    else:
+_resize_re = re.compile(r'^([0-9]+)x([0-9]+)$')
+
+
+def _parse_output(time, data):
+    return OutputEvent(time, data.encode('utf-8'))
+
+
+def _parse_resize(time, data):
+    m = _resize_re.match(data)
+    if m is None:
+        raise ValueError(f'Invalid resize data {data}')
+    cols = int(m.group(1))
+    rows = int(m.group(2))
+    return ResizeEvent(time, columns=cols, rows=rows)
+
+
+_EVENT_CTORS = {
+    'o': _parse_output,
+    'i': InputEvent,
+    'm': MarkerEvent,
+    'r': _parse_resize,
+}
+
+
+def parse_header(line):
+    if not isinstance(line, dict):
         raise ValueError('Missing asciicast header')
-    events = []
-    resize_re = re.compile(r'^([0-9]+)x([0-9]+)$')
-    for ix, line in enumerate(data[1:]):
-        if not (isinstance(line, list) and len(line) == 3):
-            raise ValueError(f'Invalid event on line {ix + 1}')
-        time_str = line[0]
-        event_code = line[1]
-        data = line[2]
-        try:
-            time = float(time_str)
-        except ValueError as e:
-            raise ValueError(
-                'Invalid event time {time_str} on line {ix + 1}'
-            ) from e
-        if event_code == 'o':
-            event = OutputEvent(time, data)
-        elif event_code == 'i':
-            event = InputEvent(time, data)
-        elif event_code == 'r':
-            m = resize_re.match(data)
-            if m is None:
-                raise ValueError(
-                    f'Invalid resize data {data} on line {ix + 1}'
-                )
-            cols = int(m.group(1))
-            rows = int(m.group(2))
-            event = ResizeEvent(time, columns=cols, rows=rows)
-        elif event_code == 'm':
-            event = MarkerEvent(time, data)
-        else:
-            raise ValueError(
-                f'Invalid event code {event_code} on line {ix + 1}'
-            )
-        events.append(event)
+    try:
+        header = Header(**line)
+    except TypeError as e:
+        raise ValueError('Invalid header data') from e
+    if header.version != 2:
+        raise ValueError(f'Unsupported file format version {header.version}')
+    return header
+
+
+def parse_event(line, ix):
+    if not (isinstance(line, list) and len(line) == 3):
+        raise ValueError(f'Invalid event on line {ix}')
+    time_str = line[0]
+    event_code = line[1]
+    data = line[2]
+    try:
+        time = float(time_str)
+    except ValueError as e:
+        raise ValueError(f'Invalid event time {time_str} on line {ix}') from e
+    ctor = _EVENT_CTORS.get(event_code)
+    if ctor is None:
+        raise ValueError(f'Invalid event code {event_code} on line {ix}')
+    try:
+        return ctor(time, data)
+    except ValueError as e:
+        raise ValueError(f'Invalid event data on line {ix}') from e
+
+
+def parse_cast(data):
+    header = parse_header(data[0])
+    events = [
+        parse_event(line, ix) for ix, line in enumerate(data[1:], start=1)
+    ]
     return AsciiCast(header=header, events=events)
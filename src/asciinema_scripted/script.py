@@ -1,71 +1,145 @@
 import dataclasses
 import json
-import numpy as np
-import os
-import pexpect
 import re
-import tempfile
 import time
-import tomli
-import tomli_w
 
-from .cast import AsciiCast, OutputEvent, MarkerEvent, CommentEvent
+from .cast import AsciiCast, Header, OutputEvent, MarkerEvent, CommentEvent
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Action:
-    action_id: str = dataclasses.field(init=False)
-
-    def __post_init__(self):
-        self.action_id = self.__class__.__name__
+    @property
+    def action_id(self):
+        # NOTE: determined by the action type, so no per-instance storage.
+        return type(self).__name__
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Input(Action):
     text: str
     pre_nl_delay: float
     post_nl_delay: float
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Marker(Action):
     label: str
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Comment(Action):
     comment: str
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Filter:
-    filter_id: str = dataclasses.field(init=False)
-
-    def __post_init__(self):
-        self.filter_id = self.__class__.__name__
+    @property
+    def filter_id(self):
+        # NOTE: determined by the filter type, so no per-instance storage.
+        return type(self).__name__
 
     def apply(self, header, events):
         raise NotImplementedError()
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class RegexReplacementFilter(Filter):
     regex: str
     replacement: str
+    # NOTE: excluded when comparing and serialising filters; output data
+    # are stored as bytes, so compile a bytes pattern.
+    _pat: re.Pattern = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+    _repl: bytes = dataclasses.field(init=False, repr=False, compare=False)
 
-    def modify_event(self, event):
-        if isinstance(event, OutputEvent):
-            new_data = re.sub(self.regex, self.replacement, event.data)
-            return dataclasses.replace(event, data=new_data)
-        else:
-            return event
+    def __post_init__(self):
+        self._pat = re.compile(self.regex.encode('utf-8'))
+        self._repl = self.replacement.encode('utf-8')
 
     def apply(self, header, events):
-        new_events = [self.modify_event(event) for event in events]
-        return new_events
+        if not any(isinstance(event, OutputEvent) for event in events):
+            return events
+        # NOTE: the events are owned by the cast being filtered, so it is
+        # safe to update the output data in place rather than rebuilding
+        # every matched event.
+        for event in events:
+            if isinstance(event, OutputEvent):
+                event.data = self._pat.sub(self._repl, event.data)
+        return events
+
 
+@dataclasses.dataclass(slots=True)
+class BatchRegexReplacementFilter(Filter):
+    """
+    Apply a sequence of regex replacement filters in a single pass over the
+    event list, rather than one pass per filter.
+    """
 
-@dataclasses.dataclass
+    filters: tuple[RegexReplacementFilter, ...]
+
+    def apply(self, header, events):
+        if not any(isinstance(event, OutputEvent) for event in events):
+            return events
+        for event in events:
+            if isinstance(event, OutputEvent):
+                new_data = event.data
+                for event_filter in self.filters:
+                    new_data = event_filter._pat.sub(
+                        event_filter._repl, new_data
+                    )
+                event.data = new_data
+        return events
+
+
+def fuse_filters(filters):
+    """
+    Collapse filter chains that would traverse the event list multiple times
+    into equivalent single-pass filters: runs of consecutive
+    :class:`RegexReplacementFilter` instances become a single
+    :class:`BatchRegexReplacementFilter`, and a :class:`StartMarkerFilter`
+    followed by an :class:`EndMarkerFilter` becomes a
+    :class:`SliceMarkerFilter`.
+    """
+    fused = []
+    run = []
+    ix = 0
+    while ix < len(filters):
+        event_filter = filters[ix]
+        if isinstance(event_filter, RegexReplacementFilter):
+            run.append(event_filter)
+            ix += 1
+            continue
+        if run:
+            fused.append(_fuse_run(run))
+            run = []
+        if (
+            isinstance(event_filter, StartMarkerFilter)
+            and ix + 1 < len(filters)
+            and isinstance(filters[ix + 1], EndMarkerFilter)
+        ):
+            fused.append(
+                SliceMarkerFilter(
+                    start_label=event_filter.start_label,
+                    end_label=filters[ix + 1].end_label,
+                )
+            )
+            ix += 2
+            continue
+        fused.append(event_filter)
+        ix += 1
+    if run:
+        fused.append(_fuse_run(run))
+    return tuple(fused)
+
+
+def _fuse_run(run):
+    if len(run) == 1:
+        return run[0]
+    return BatchRegexReplacementFilter(filters=tuple(run))
+
+
+@dataclasses.dataclass(slots=True)
 class StartMarkerFilter(Filter):
     start_label: str
 
@@ -81,11 +155,14 @@ class StartMarkerFilter(Filter):
         return new_events
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class EndMarkerFilter(Filter):
     end_label: str
 
     def apply(self, header, events):
+        # NOTE: without an end marker, every event is retained.
+        if not any(isinstance(event, MarkerEvent) for event in events):
+            return events
         new_events = []
         for event in events:
             if isinstance(event, MarkerEvent):
@@ -95,79 +172,206 @@ class EndMarkerFilter(Filter):
         return new_events
 
 
-@dataclasses.dataclass
-class CommentFilter(Filter):
-    def modify_event(self, event, num_cols, num_rows):
-        if not isinstance(event, CommentEvent):
-            return event
-        if event.top:
-            line_num = 1
-        else:
-            line_num = num_rows
-        # NOTE: display comments with reversed foreground/background colours.
-        rev_start = '\u001b[7m'
-        rev_end = '\u001b[m'
-        comment = f'{rev_start}{event.comment:^{num_cols}}{rev_end}'
-        data = f'\u001b[s\u001b[{line_num};1H{comment}\u001b[u'
-        return OutputEvent(event.time, data)
+@dataclasses.dataclass(slots=True)
+class SliceMarkerFilter(Filter):
+    """
+    Retain only the events between a start marker and an end marker,
+    scanning the event list once.
+
+    This is equivalent to applying a :class:`StartMarkerFilter` followed by
+    an :class:`EndMarkerFilter`.
+    """
+
+    start_label: str
+    end_label: str
 
     def apply(self, header, events):
-        w = header.width
-        h = header.height
-        new_events = [self.modify_event(event, w, h) for event in events]
+        start_ix = None
+        for ix, event in enumerate(events):
+            if isinstance(event, MarkerEvent):
+                if start_ix is None:
+                    if event.label == self.start_label:
+                        start_ix = ix
+                elif event.label == self.end_label:
+                    return events[start_ix + 1 : ix]
+        if start_ix is None:
+            return []
+        return events[start_ix + 1 :]
+
+
+@dataclasses.dataclass(slots=True)
+class CommentFilter(Filter):
+    def apply(self, header, events):
+        if not any(isinstance(event, CommentEvent) for event in events):
+            return events
+        # NOTE: display comments with reversed foreground/background
+        # colours. The escape sequences depend only on the terminal
+        # dimensions, so build them once per pass.
+        top_prefix = '\u001b[s\u001b[1;1H\u001b[7m'
+        bottom_prefix = f'\u001b[s\u001b[{header.height};1H\u001b[7m'
+        suffix = '\u001b[m\u001b[u'
+        fmt = '{:^' + str(header.width) + '}'
+        new_events = []
+        for event in events:
+            if isinstance(event, CommentEvent):
+                prefix = top_prefix if event.top else bottom_prefix
+                data = prefix + fmt.format(event.comment) + suffix
+                event = OutputEvent(event.time, data.encode('utf-8'))
+            new_events.append(event)
         return new_events
 
 
+_FILTER_CTORS = {
+    'RegexReplacementFilter': RegexReplacementFilter,
+    'StartMarkerFilter': StartMarkerFilter,
+    'EndMarkerFilter': EndMarkerFilter,
+    'SliceMarkerFilter': SliceMarkerFilter,
+    'CommentFilter': CommentFilter,
+}
+
+
 def parse_filter(filter_tbl):
     f_class = filter_tbl['filter_id']
-    kwargs = {k: v for k, v in filter_tbl.items() if k != 'filter_id'}
-    if f_class == 'RegexReplacementFilter':
-        return RegexReplacementFilter(**kwargs)
-    elif f_class == 'StartMarkerFilter':
-        return StartMarkerFilter(**kwargs)
-    elif f_class == 'EndMarkerFilter':
-        return EndMarkerFilter(**kwargs)
-    elif f_class == 'CommentFilter':
-        return CommentFilter(**kwargs)
-    else:
+    ctor = _FILTER_CTORS.get(f_class)
+    if ctor is None:
         raise ValueError(f'Invalid filter {f_class}')
+    kwargs = {k: v for k, v in filter_tbl.items() if k != 'filter_id'}
+    return ctor(**kwargs)
 
 
 def parse_filters(filter_list):
     return tuple(parse_filter(filter_tbl) for filter_tbl in filter_list)
 
 
+_ACTION_CTORS = {
+    'Input': Input,
+    'Marker': Marker,
+    'Comment': Comment,
+}
+
+
 def parse_action(action_tbl):
     if isinstance(action_tbl, str):
         return action_tbl
     s_class = action_tbl['action_id']
-    kwargs = {k: v for k, v in action_tbl.items() if k != 'action_id'}
-    if s_class == 'Input':
-        return Input(**kwargs)
-    elif s_class == 'Marker':
-        return Marker(**kwargs)
-    elif s_class == 'Comment':
-        return Comment(**kwargs)
-    else:
+    ctor = _ACTION_CTORS.get(s_class)
+    if ctor is None:
         raise ValueError(f'Invalid step {s_class}')
+    kwargs = {k: v for k, v in action_tbl.items() if k != 'action_id'}
+    return ctor(**kwargs)
 
 
 def parse_actions(action_list):
     return tuple(parse_action(action_tbl) for action_tbl in action_list)
 
 
-def send_line(proc, content, rng, typing_delay, pre_nl_delay, post_nl_delay):
-    for char in content:
-        proc.send(char)
-        time.sleep(rng.uniform(**typing_delay))
-    time.sleep(rng.uniform(**pre_nl_delay))
-    proc.send('\n')
-    final_delay = rng.uniform(**post_nl_delay)
-    time.sleep(final_delay)
+def _to_table(item):
+    """
+    Convert an action or filter into a table, without recursing into the
+    field values (plain string actions are returned unchanged).
+    """
+    if isinstance(item, str):
+        return item
+    # NOTE: the identifier is a property, not a field, so record it first.
+    if isinstance(item, Action):
+        table = {'action_id': item.action_id}
+    else:
+        table = {'filter_id': item.filter_id}
+    for field in dataclasses.fields(item):
+        if not field.name.startswith('_'):
+            table[field.name] = getattr(item, field.name)
+    return table
+
+
+class AsciinemaRecorder:
+    """
+    Record a session by sending input to an ``asciinema rec`` process.
+    """
+
+    def __init__(self, output_file, rec_args, screen_rc=None):
+        import pexpect
+
+        cmd_args = ['rec'] + rec_args + [output_file]
+        self.proc = pexpect.spawn('asciinema', cmd_args)
+        self.t0 = time.time()
+        self.screen_rc = screen_rc
+
+    def send(self, text):
+        self.proc.send(text)
+
+    def delay(self, seconds):
+        time.sleep(seconds)
+
+    def elapsed(self):
+        return time.time() - self.t0
+
+    def close(self):
+        import os
+
+        self.proc.close()
+        if self.screen_rc is not None:
+            os.unlink(self.screen_rc)
+
+
+class NullRecorder:
+    """
+    Write a minimal cast file directly, without spawning asciinema and
+    without sleeping in real time (delays advance a virtual clock).
+
+    This exercises the action and post-processing paths at full speed,
+    which is useful for tests and benchmarks.
+    """
+
+    def __init__(self, output_file, width, height):
+        self.output_file = output_file
+        self.width = width
+        self.height = height
+        self.now = 0.0
+        self.events = []
+
+    def send(self, text):
+        self.events.append(
+            OutputEvent(round(self.now, 6), text.encode('utf-8'))
+        )
+
+    def delay(self, seconds):
+        # NOTE: delays may be numpy scalars, which are not serialisable.
+        self.now += float(seconds)
+
+    def elapsed(self):
+        return self.now
+
+    def close(self):
+        header = Header(version=2, width=self.width, height=self.height)
+        AsciiCast(header=header, events=self.events).save(self.output_file)
+
+
+def send_line(
+    recorder,
+    content,
+    rng,
+    typing_delay,
+    pre_nl_delay,
+    post_nl_delay,
+    batch_chars=1,
+):
+    # NOTE: each delay argument is a (low, high) tuple; sample every
+    # per-character typing delay in a single call.
+    delays = rng.uniform(*typing_delay, size=len(content))
+    # Send characters in chunks of (at most) batch_chars, sleeping for the
+    # combined delay of each chunk. Larger chunks mean fewer writes to the
+    # terminal, at the cost of a coarser typing cadence.
+    for ix in range(0, len(content), batch_chars):
+        recorder.send(content[ix : ix + batch_chars])
+        recorder.delay(delays[ix : ix + batch_chars].sum())
+    recorder.delay(rng.uniform(*pre_nl_delay))
+    recorder.send('\n')
+    final_delay = rng.uniform(*post_nl_delay)
+    recorder.delay(final_delay)
     return final_delay
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Script:
     output_file: str
     start_delay: float
@@ -181,6 +385,7 @@ class Script:
     filters: tuple[Filter]
     cols: int | None = None
     rows: int | None = None
+    batch_chars: int = 1
 
     @classmethod
     def default(cls, output_file, **kwargs):
@@ -197,6 +402,7 @@ class Script:
             'filters': tuple(),
             'cols': None,
             'rows': None,
+            'batch_chars': 1,
         }
         defaults.update(**kwargs)
         return cls(**defaults)
@@ -222,16 +428,37 @@ class Script:
         return dataclasses.replace(self, filters=tuple(filters))
 
     def run(self, quiet=False):
+        # NOTE: only import numpy when running a script, so that other
+        # workflows do not pay the (substantial) import cost.
+        import numpy as np
+
         rng = np.random.default_rng(seed=12345)
-        typing_delay = dict(
-            zip(['low', 'high'], self.typing_delay, strict=True)
-        )
-        pre_nl_delay = dict(
-            zip(['low', 'high'], self.pre_nl_delay, strict=True)
-        )
-        post_nl_delay = dict(
-            zip(['low', 'high'], self.post_nl_delay, strict=True)
-        )
+        recorder = self._spawn_recorder()
+        recorder.delay(self.start_delay)
+        insert_events = self._drive_actions(recorder, rng, quiet)
+        recorder.delay(self.end_delay)
+        recorder.close()
+        print()
+        self._postprocess(insert_events)
+
+    def _spawn_recorder(self):
+        """
+        Create the recorder named by the ``ASCIINEMA_SCRIPTED_RECORDER``
+        environment variable: ``'asciinema'`` (the default) or ``'null'``.
+        """
+        import os
+
+        recorder = os.environ.get('ASCIINEMA_SCRIPTED_RECORDER', 'asciinema')
+        if recorder == 'null':
+            return NullRecorder(
+                self.output_file,
+                width=self.cols if self.cols is not None else 80,
+                height=self.rows if self.rows is not None else 24,
+            )
+        elif recorder != 'asciinema':
+            raise ValueError(f'Invalid recorder {recorder}')
+
+        import tempfile
 
         rec_args = ['--overwrite']
 
@@ -242,51 +469,58 @@ class Script:
             rec_args.extend(['--rows', str(self.rows)])
 
         # Run inside a GNU screen session in order to display comments.
+        screen_rc = None
         if self.with_comments:
-            screen_rc = tempfile.NamedTemporaryFile('w', delete=False)
+            rc_file = tempfile.NamedTemporaryFile('w', delete=False)
             if self.comments_at_top:
                 action = 'first'
             else:
                 action = 'last'
-            screen_rc.write(f'hardstatus always{action}line\n')
-            screen_rc.write('hardstatus string " "\n')
-            screen_rc.write('altscreen on\n')
-            screen_rc.close()
+            rc_file.write(f'hardstatus always{action}line\n')
+            rc_file.write('hardstatus string " "\n')
+            rc_file.write('altscreen on\n')
+            rc_file.close()
+            screen_rc = rc_file.name
             rec_args.insert(0, '-c')
-            rec_args.insert(1, f'screen -c "{screen_rc.name}"')
+            rec_args.insert(1, f'screen -c "{screen_rc}"')
 
-        cmd_args = ['rec'] + rec_args + [self.output_file]
-        proc = pexpect.spawn('asciinema', cmd_args)
-        t0 = time.time()
-        newline_delay = 0
+        return AsciinemaRecorder(
+            self.output_file, rec_args, screen_rc=screen_rc
+        )
 
-        time.sleep(self.start_delay)
+    def _drive_actions(self, recorder, rng, quiet):
+        """
+        Perform each scripted action, returning the marker and comment
+        events to insert into the recording.
+        """
+        newline_delay = 0
 
         insert_events = []
 
         for action in self.actions:
             if isinstance(action, str):
                 content = action
-                posargs = [typing_delay, pre_nl_delay, post_nl_delay]
+                posargs = [
+                    self.typing_delay,
+                    self.pre_nl_delay,
+                    self.post_nl_delay,
+                ]
             elif isinstance(action, Input):
                 content = action.text
                 posargs = [
-                    typing_delay,
-                    {'low': action.pre_nl_delay, 'high': action.pre_nl_delay},
-                    {
-                        'low': action.post_nl_delay,
-                        'high': action.post_nl_delay,
-                    },
+                    self.typing_delay,
+                    (action.pre_nl_delay, action.pre_nl_delay),
+                    (action.post_nl_delay, action.post_nl_delay),
                 ]
             elif isinstance(action, Marker):
-                rel_time = time.time() - t0
+                rel_time = recorder.elapsed()
                 # NOTE: make the marker appear *before* the next line begins.
                 rel_time -= 0.8 * newline_delay
                 rel_time = round(rel_time, 3)
                 insert_events.append(MarkerEvent(rel_time, action.label))
                 continue
             elif isinstance(action, Comment):
-                rel_time = time.time() - t0
+                rel_time = recorder.elapsed()
                 # NOTE: make the comment appear *before* the next line begins.
                 rel_time -= 0.8 * newline_delay
                 rel_time = round(rel_time, 3)
@@ -299,26 +533,68 @@ class Script:
             else:
                 raise ValueError(f'Invalid input line {action}')
 
-            newline_delay = send_line(proc, content, rng, *posargs)
+            newline_delay = send_line(
+                recorder, content, rng, *posargs, batch_chars=self.batch_chars
+            )
             if not quiet:
                 print('.', end='', flush=True)
 
-        time.sleep(self.end_delay)
-
-        proc.close()
-        print()
-
-        if self.with_comments:
-            os.unlink(screen_rc.name)
+        return insert_events
 
-        # Post-processing.
+    def _postprocess(self, insert_events):
         cast = AsciiCast.load(self.output_file)
-        cast = cast.insert_events(insert_events)
-        cast = cast.filter_events(self.filters)
+        # NOTE: markers and comments are recorded in chronological order, so
+        # the sortedness check can be skipped.
+        cast = cast.insert_events(insert_events, assume_sorted=True)
+        cast = cast.filter_events(fuse_filters(self.filters))
         cast.save(self.output_file)
 
+    @classmethod
+    def _load_cached(cls, script_file, loader):
+        """
+        Load a script from ``script_file`` with ``loader``, reusing a JSON
+        cache file (if one exists and is at least as recent as the script
+        file) to avoid re-parsing the script on every invocation.
+        """
+        import os
+
+        cache_file = f'{script_file}.cache.json'
+        try:
+            fresh = (
+                os.stat(cache_file).st_mtime >= os.stat(script_file).st_mtime
+            )
+        except OSError:
+            fresh = False
+        if fresh:
+            # NOTE: fall back to the real loader if the cache cannot be
+            # read (e.g., a truncated cache from an interrupted write, or a
+            # cache written by a different package version).
+            try:
+                return cls.from_json(cache_file)
+            except (OSError, ValueError, TypeError, KeyError):
+                pass
+
+        script = loader(script_file)
+        # NOTE: the cache is an optimisation, so ignore write failures
+        # (e.g., when the script is located in a read-only directory).
+        # Write to a temporary file and rename it into place, so that an
+        # interrupted write cannot leave a fresh but partial cache.
+        temp_file = f'{cache_file}.tmp'
+        try:
+            script.to_json(temp_file)
+            os.replace(temp_file, cache_file)
+        except OSError:
+            pass
+        return script
+
     @classmethod
     def from_toml(cls, toml_file):
+        return cls._load_cached(toml_file, cls._parse_toml)
+
+    @classmethod
+    def _parse_toml(cls, toml_file):
+        import tomli
+
         with open(toml_file, 'rb') as f:
             data = tomli.load(f)
         return cls.from_dict(data)
@@ -331,6 +607,10 @@ class Script:
 
     @classmethod
     def from_yaml(cls, yaml_file):
+        return cls._load_cached(yaml_file, cls._parse_yaml)
+
+    @classmethod
+    def _parse_yaml(cls, yaml_file):
         try:
             import yaml
         except ModuleNotFoundError as e:
@@ -354,15 +634,22 @@ class Script:
         return cls(**script_data)
 
     def to_dict(self):
-        data = dataclasses.asdict(self)
-        tuple_fields = [
-            key for key, value in data.items() if isinstance(value, tuple)
-        ]
-        for k in tuple_fields:
-            data[k] = list(data[k])
+        # NOTE: avoid dataclasses.asdict, which recursively deep-copies
+        # every action and filter; actions and filters are only one level
+        # deep, so a shallow conversion suffices.
+        data = {}
+        for field in dataclasses.fields(self):
+            value = getattr(self, field.name)
+            if field.name in ('actions', 'filters'):
+                value = [_to_table(item) for item in value]
+            elif isinstance(value, tuple):
+                value = list(value)
+            data[field.name] = value
         return data
 
     def to_toml(self, toml_file):
+        import tomli_w
+
         data = self.to_dict()
         with open(toml_file, 'wb') as f:
             tomli_w.dump(data, f)
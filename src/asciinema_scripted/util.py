@@ -1,25 +1,30 @@
+import sys
+
 from .script import MarkerEvent
 
 
 def marker_md_list(events, data_video_id=None):
+    return list(iter_marker_md_links(events, data_video_id))
+
+
+def iter_marker_md_links(events, data_video_id=None):
     if data_video_id is None:
         data_video_attr = ''
     else:
         data_video_attr = f' data-video="{data_video_id}"'
 
-    lines = []
     for event in events:
         if isinstance(event, MarkerEvent):
-            link = (
+            yield (
                 f'<a{data_video_attr}'
                 f' data-seek-to="{event.time}"'
                 f' href="javascript:;">{event.label}</a>'
             )
-            lines.append(link)
-    return lines
 
 
 def print_marker_md_list(cast, data_video_id):
-    lines = marker_md_list(cast.events, data_video_id)
-    for ix, line in enumerate(lines):
-        print(f'{ix + 1}. {line}')
+    links = iter_marker_md_links(cast.events, data_video_id)
+    # NOTE: emit the entire list with a single write.
+    lines = '\n'.join(f'{ix + 1}. {link}' for ix, link in enumerate(links))
+    if lines:
+        sys.stdout.write(f'{lines}\n')
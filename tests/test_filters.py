@@ -0,0 +1,66 @@
+from asciinema_scripted import (
+    RegexReplacementFilter,
+    StartMarkerFilter,
+    EndMarkerFilter,
+    SliceMarkerFilter,
+)
+from asciinema_scripted.cast import Header, OutputEvent, MarkerEvent
+from asciinema_scripted.script import (
+    BatchRegexReplacementFilter,
+    fuse_filters,
+)
+
+
+def header():
+    return Header(version=2, width=80, height=24)
+
+
+def test_fuse_filters_collapses_regex_runs():
+    filters = (
+        RegexReplacementFilter(regex='foo', replacement='bar'),
+        RegexReplacementFilter(regex='bar', replacement='baz'),
+    )
+    fused = fuse_filters(filters)
+    assert len(fused) == 1
+    assert isinstance(fused[0], BatchRegexReplacementFilter)
+    # Ensure the fused filter applies the replacements in order.
+    events = [OutputEvent(0.1, b'foo'), MarkerEvent(0.2, 'foo')]
+    new_events = fused[0].apply(header(), events)
+    assert new_events[0].data == b'baz'
+    assert new_events[1].label == 'foo'
+
+
+def test_fuse_filters_preserves_single_filters():
+    filters = (RegexReplacementFilter(regex='foo', replacement='bar'),)
+    assert fuse_filters(filters) == filters
+
+
+def test_fuse_filters_collapses_marker_pairs():
+    filters = (
+        StartMarkerFilter(start_label='BEGIN'),
+        EndMarkerFilter(end_label='END'),
+    )
+    fused = fuse_filters(filters)
+    assert fused == (SliceMarkerFilter(start_label='BEGIN', end_label='END'),)
+
+
+def test_slice_marker_filter_matches_start_plus_end():
+    events = [
+        OutputEvent(0.1, b'before'),
+        MarkerEvent(0.2, 'BEGIN'),
+        OutputEvent(0.3, b'inside'),
+        MarkerEvent(0.4, 'END'),
+        OutputEvent(0.5, b'after'),
+    ]
+    start = StartMarkerFilter(start_label='BEGIN')
+    end = EndMarkerFilter(end_label='END')
+    combined = SliceMarkerFilter(start_label='BEGIN', end_label='END')
+    expected = end.apply(header(), start.apply(header(), events))
+    assert combined.apply(header(), events) == expected
+    assert [event.data for event in expected] == [b'inside']
+
+
+def test_slice_marker_filter_without_start_marker():
+    events = [OutputEvent(0.1, b'before'), MarkerEvent(0.4, 'END')]
+    combined = SliceMarkerFilter(start_label='BEGIN', end_label='END')
+    assert combined.apply(header(), events) == []
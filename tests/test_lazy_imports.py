@@ -0,0 +1,18 @@
+import subprocess
+import sys
+
+
+def test_import_does_not_load_heavy_modules():
+    """
+    Ensure that importing the package does not import modules that are only
+    required for recording scripts (e.g., numpy and pexpect).
+    """
+    check = (
+        'import sys;'
+        'import asciinema_scripted;'
+        "assert 'numpy' not in sys.modules;"
+        "assert 'pexpect' not in sys.modules;"
+        "assert 'tomli' not in sys.modules;"
+        "assert 'tomli_w' not in sys.modules"
+    )
+    subprocess.run([sys.executable, '-c', check], check=True)
@@ -11,6 +11,20 @@ def test_run_demo():
     Run the demonstration script and ensure that only 1 of the 2 markers is
     recorded (the other marker is used to truncate the recording).
     """
+    check_run_demo()
+
+
+def test_run_demo_null(monkeypatch):
+    """
+    Run the demonstration script with the null recorder, which exercises
+    the same action and post-processing paths without spawning asciinema or
+    sleeping in real time.
+    """
+    monkeypatch.setenv('ASCIINEMA_SCRIPTED_RECORDER', 'null')
+    check_run_demo()
+
+
+def check_run_demo():
     expected_length = 1
     expected_marker = 'Sum disk usage of all files'
 
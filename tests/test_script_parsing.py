@@ -32,6 +32,20 @@ def test_script_parsing_yaml_round_trip(tmp_path):
     assert parsed_script == input_script
 
 
+def test_script_parsing_ignores_corrupt_cache(tmp_path):
+    yaml_file = tmp_path / 'test_script_parsing_corrupt_cache.yaml'
+    input_script = demo_script()
+    input_script.to_yaml(yaml_file)
+    # Write a fresh but truncated cache file; it must be ignored.
+    cache_file = yaml_file.parent / f'{yaml_file.name}.cache.json'
+    cache_file.write_text('{"output_file":')
+    parsed_script = Script.from_yaml(yaml_file)
+    assert parsed_script == input_script
+    # Ensure that the cache was rewritten and can now be reused.
+    parsed_script = Script.from_json(cache_file)
+    assert parsed_script == input_script
+
+
 def demo_script():
     actions = [
         Comment('See what files are here'),